@@ -19,6 +19,29 @@ OPENAI_MODEL: str = "gpt-4o"
 OPENAI_MAX_TOKENS: int = 16384  # GPT-4o max output tokens
 OPENAI_TEMPERATURE: float = 0.1  # Low temperature to reduce hallucination
 
+# Account rate limits — requests are throttled client-side to stay below them
+OPENAI_MAX_REQUESTS_PER_MINUTE: int = int(
+    os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE", "500")
+)
+OPENAI_MAX_TOKENS_PER_MINUTE: int = int(
+    os.getenv("OPENAI_MAX_TOKENS_PER_MINUTE", "450000")
+)
+
+# ── Response Cache ───────────────────────────────────────────
+# Exact-match cache of OpenAI responses; set DOC2MD_CACHE=0 to disable
+CACHE_ENABLED: bool = os.getenv("DOC2MD_CACHE", "1") == "1"
+CACHE_DIR: Path = PROJECT_ROOT / ".cache"
+
+# ── Semantic Cache ───────────────────────────────────────────
+# Reuse conversions of identical chunks and pass those of similar chunks
+# (matched by embedding) as reference; set DOC2MD_SEMANTIC_CACHE=0 to disable
+SEMANTIC_CACHE_ENABLED: bool = os.getenv("DOC2MD_SEMANTIC_CACHE", "1") == "1"
+OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+# Cosine similarity at/above which a cached conversion guides a new request
+SEMANTIC_HINT_THRESHOLD: float = float(
+    os.getenv("DOC2MD_SEMANTIC_HINT_THRESHOLD", "0.90")
+)
+
 # ── I/O Directories ──────────────────────────────────────────
 INPUT_DIR: Path = PROJECT_ROOT / "input"
 OUTPUT_DIR: Path = PROJECT_ROOT / "output"
@@ -15,46 +15,112 @@ Usage
 
   # Convert all .docx files in a custom folder
   python main.py --input-dir /path/to/folder
+
+  # Ignore all cached OpenAI responses (exact and semantic)
+  # and call the API again
+  python main.py --no-cache
+
+  # Do not reuse or reference conversions of identical / similar chunks
+  python main.py --no-semantic-cache
+
+Multiple files are converted concurrently; each file's progress block
+is printed once it finishes.
 """
 
 from __future__ import annotations
 
 import argparse
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-
-from config.settings import INPUT_DIR, OUTPUT_DIR
-from src.docx_parser import parse_docx
+from typing import Callable
+
+from config.settings import (
+    CACHE_ENABLED,
+    INPUT_DIR,
+    OUTPUT_DIR,
+    SEMANTIC_CACHE_ENABLED,
+)
+from src.docx_parser import parse_docx_iter
 from src.ai_processor import process_with_ai
 from src.markdown_writer import save_markdown
 
 
-def convert_file(docx_path: Path) -> Path:
+# Max number of files converted at the same time
+MAX_PARALLEL_FILES = 8
+
+# Serialises progress output from worker threads
+_print_lock = threading.Lock()
+
+
+def convert_file(
+    docx_path: Path,
+    log: Callable[[str], None] = print,
+    use_cache: bool = CACHE_ENABLED,
+    use_semantic_cache: bool = SEMANTIC_CACHE_ENABLED,
+) -> Path:
     """
     Full pipeline for a single .docx file:
     parse → AI process → write Markdown.
 
+    Progress lines are passed to *log*; *use_cache* and
+    *use_semantic_cache* enable the exact / semantic response caches.
     Returns the path of the generated .md file.
     """
     file_name = docx_path.name
-    print(f"  📄 Parsing:    {file_name}")
-    elements = parse_docx(docx_path)
-
-    text_count = sum(1 for e in elements if e["type"] == "text")
-    image_count = sum(1 for e in elements if e["type"] == "image")
-    print(f"     ├─ Text blocks : {text_count}")
-    print(f"     ├─ Images      : {image_count}")
-
-    print(f"  🤖 Processing: Sending to GPT-4o ...")
-    markdown = process_with_ai(elements, file_name)
+    log(f"  📄 Parsing:    {file_name}")
+    # The AI step consumes the element iterator in one pass and reports
+    # the text / image counts itself.
+    elements = parse_docx_iter(docx_path)
+
+    log(f"  🤖 Processing: Sending to GPT-4o ...")
+    markdown = process_with_ai(
+        elements,
+        file_name,
+        use_cache=use_cache,
+        use_semantic_cache=use_semantic_cache,
+        log=log,
+    )
 
-    print(f"  💾 Writing:    {docx_path.stem}.md")
+    log(f"  💾 Writing:    {docx_path.stem}.md")
     output_path = save_markdown(markdown, file_name)
 
-    print(f"  ✅ Done:       {output_path}")
+    log(f"  ✅ Done:       {output_path}")
     return output_path
 
 
+def _convert_and_report(
+    docx_path: Path,
+    idx: int,
+    total: int,
+    use_cache: bool,
+    use_semantic_cache: bool,
+) -> bool:
+    """
+    Run :func:`convert_file` in a worker thread, buffering its progress
+    lines and printing them as one block when the file is finished.
+
+    Returns True on success.
+    """
+    lines = [f"\n[{idx}/{total}] {docx_path.name}", "-" * 40]
+    try:
+        convert_file(
+            docx_path,
+            log=lines.append,
+            use_cache=use_cache,
+            use_semantic_cache=use_semantic_cache,
+        )
+        ok = True
+    except Exception as exc:
+        lines.append(f"  ❌ Failed: {exc}")
+        ok = False
+
+    with _print_lock:
+        print("\n".join(lines))
+    return ok
+
+
 def gather_docx_files(source: str | None) -> list[Path]:
     """
     Determine which .docx files to process.
@@ -104,6 +170,26 @@ def main() -> None:
         default=None,
         help="Alias for the source argument (directory of .docx files).",
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        default=CACHE_ENABLED,
+        help=(
+            "Do not read or write any cached OpenAI responses "
+            "(exact or semantic)."
+        ),
+    )
+    parser.add_argument(
+        "--no-semantic-cache",
+        dest="use_semantic_cache",
+        action="store_false",
+        default=SEMANTIC_CACHE_ENABLED,
+        help=(
+            "Do not reuse conversions of identical text chunks or pass "
+            "those of similar chunks as reference."
+        ),
+    )
     args = parser.parse_args()
 
     source = args.source or args.input_dir
@@ -119,15 +205,31 @@ def main() -> None:
     success_count = 0
     fail_count = 0
 
-    for idx, docx_path in enumerate(docx_files, start=1):
-        print(f"\n[{idx}/{len(docx_files)}] {docx_path.name}")
-        print("-" * 40)
+    total = len(docx_files)
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_FILES, total)) as ex:
+        futures = {
+            ex.submit(
+                _convert_and_report,
+                docx_path,
+                idx,
+                total,
+                args.use_cache,
+                args.use_semantic_cache,
+            ): docx_path
+            for idx, docx_path in enumerate(docx_files, start=1)
+        }
         try:
-            convert_file(docx_path)
-            success_count += 1
-        except Exception as exc:
-            print(f"  ❌ Failed: {exc}")
-            fail_count += 1
+            for future in as_completed(futures):
+                if future.result():
+                    success_count += 1
+                else:
+                    fail_count += 1
+        except KeyboardInterrupt:
+            # Drop the queued files; only those already running finish
+            ex.shutdown(wait=False, cancel_futures=True)
+            with _print_lock:
+                print("\n  ⛔ Interrupted: queued files cancelled, finishing running ones")
+            raise
 
     print("\n" + "=" * 60)
     print(f"  🏁 Completed:  {success_count} succeeded, {fail_count} failed")
@@ -1,7 +1,7 @@
 """
 AI Processor Module
 ───────────────────
-Sends extracted content (text + Base64 images) to OpenAI GPT-4o
+Sends extracted content (text + images) to OpenAI GPT-4o
 and returns the generated Markdown string.
 
 Architecture:
@@ -10,46 +10,287 @@ Architecture:
 - Step 1: All text is chunked and translated/formatted.
 - Step 2: Each image is sent separately for description.
 - Step 3: Results are merged in document order.
+
+All text-chunk and image requests are dispatched concurrently on an
+``AsyncOpenAI`` client (bounded by a semaphore), so wall time is close
+to the slowest single request rather than the sum of all of them.
+Responses are collected as they complete and placed by their original
+index, so progress can be logged while the rest are still in flight.
+A shared token bucket keeps the dispatch rate under the account's
+RPM/TPM limits instead of relying on 429 retries.
+
+The client, rate limiter and event loop are process-wide: every call to
+``process_with_ai`` (from any thread) runs on one background event loop,
+so HTTP connections are pooled across files.
+
+Responses are streamed, and text responses are filtered line by line as
+tokens arrive rather than post-processed as one big string.
+
+Every text request shares one byte-identical system message (the system
+prompt, verbatim); the file name and per-request instructions follow as
+user messages.  That keeps the long prefix eligible for OpenAI's
+automatic prompt caching across chunks and across files.
+
+Responses are cached in a SQLite file under ``CACHE_DIR`` keyed by a hash
+of the full request, so re-running a conversion only pays for changed
+content.
+On top of that, a semantic cache works per text chunk: a chunk with
+exactly the same source text reuses its earlier conversion outright, and
+a similar one (matched by embedding) sends that conversion along as a
+reference.
 """
 
 from __future__ import annotations
 
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import random
 import re
-from typing import Dict, List
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
-from openai import OpenAI
+import httpx
+try:
+    import tiktoken
+except ImportError:  # optional: token counts fall back to a heuristic
+    tiktoken = None
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
 
 from config.settings import (
+    CACHE_DIR,
+    CACHE_ENABLED,
     OPENAI_API_KEY,
+    OPENAI_EMBEDDING_MODEL,
+    OPENAI_MAX_REQUESTS_PER_MINUTE,
     OPENAI_MAX_TOKENS,
+    OPENAI_MAX_TOKENS_PER_MINUTE,
     OPENAI_MODEL,
     OPENAI_TEMPERATURE,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_HINT_THRESHOLD,
 )
-from src.prompts import SYSTEM_PROMPT
-
-# Max chars per text chunk
-_MAX_TEXT_CHARS_PER_CHUNK = 6_000
-
-# Prompt for processing images only
-_IMAGE_PROMPT = """You are a Senior Technical Documentation Engineer.
-Analyze this image from a technical document:
-- If it is a technical diagram, architecture chart, flow chart, or data table:
-  Describe it in detail as structured English text (use bullet points or numbered lists).
-- If it is a UI screenshot or interface mockup:
-  Reply with exactly: SKIP_UI_IMAGE
-- Do NOT output any image references or placeholders.
-- Do NOT invent information not shown in the image."""
-
-# Continuation prompt for text chunks after the first
-_CONTINUATION_PROMPT = """You are continuing the conversion of the same document.
-The previous chunk has already been converted. Now convert THIS chunk only.
-- Do NOT add a Document Header again.
-- Do NOT repeat content from previous chunks.
-- Continue with the next logical section headings.
-- Maintain the same Markdown style and formatting.
-- CRITICAL: Convert EVERY SINGLE paragraph, bullet point, table row, discussion note, date, Q&A, proposal, decision, and detail. This is NOT a summary task. Nothing can be omitted.
-- Translate all Chinese content into professional technical English.
-"""
+from src.cache import ResponseCache, SemanticCache, request_key
+from src.prompts import (
+    BATCH_PROMPT,
+    CONTINUATION_BATCH_PROMPT,
+    CONTINUATION_PROMPT,
+    IMAGE_PROMPT,
+    REFERENCE_PROMPT,
+    SYSTEM_PROMPT,
+    render_file_name_prompt,
+)
+
+# Max tokens per text chunk (about 6,000 chars of Chinese or 16,000 of English)
+_MAX_TEXT_TOKENS_PER_CHUNK = 4_000
+
+# Max tokens of chunk content packed into one multi-chunk request.  The
+# converted output is at least as long as the input, so this stays well
+# under OPENAI_MAX_TOKENS; see also _max_request_tokens().
+_MAX_REQUEST_TOKENS = 12_000
+
+# GPT-4o context window (input + output tokens)
+_CONTEXT_WINDOW_TOKENS = 128_000
+
+# Default number of OpenAI requests allowed in flight at once
+_NUM_CONCURRENT = 10
+
+# HTTP connection pool of the shared client (all files, all requests).
+# Streams hold their connection for the whole generation, so requests are
+# also capped process-wide at this many (see _get_connection_slots()).
+_MAX_CONNECTIONS = 32
+_MAX_KEEPALIVE_CONNECTIONS = 16
+
+# Attempts per request when the API still answers 429 (rate limited)
+_MAX_ATTEMPTS = 5
+
+# Rough token cost of one "detail: high" image in the rate-limit estimate
+_IMAGE_TOKEN_ESTIMATE = 1_105
+
+
+class RateLimiter:
+    """
+    Token bucket for the OpenAI requests-per-minute and tokens-per-minute
+    limits.  Both buckets refill continuously; a request is dispatched only
+    once both have room for it.
+    """
+
+    def __init__(
+        self, max_requests_per_minute: float, max_tokens_per_minute: float
+    ) -> None:
+        self.max_requests_per_minute = float(max_requests_per_minute)
+        self.max_tokens_per_minute = float(max_tokens_per_minute)
+        self.available_request_capacity = self.max_requests_per_minute
+        self.available_token_capacity = self.max_tokens_per_minute
+        self.last_update_time = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_update_time
+        self.available_request_capacity = min(
+            self.available_request_capacity
+            + self.max_requests_per_minute * elapsed / 60.0,
+            self.max_requests_per_minute,
+        )
+        self.available_token_capacity = min(
+            self.available_token_capacity
+            + self.max_tokens_per_minute * elapsed / 60.0,
+            self.max_tokens_per_minute,
+        )
+        self.last_update_time = now
+
+    async def acquire(self, token_estimate: int) -> None:
+        """Wait until both buckets allow one request of *token_estimate* tokens."""
+        # A request larger than the whole bucket only needs a full bucket
+        tokens = min(float(token_estimate), self.max_tokens_per_minute)
+        while True:
+            self._refill()
+            if (
+                self.available_request_capacity >= 1
+                and self.available_token_capacity >= tokens
+            ):
+                self.available_request_capacity -= 1
+                self.available_token_capacity -= tokens
+                return
+
+            request_deficit = max(0.0, 1 - self.available_request_capacity)
+            token_deficit = max(0.0, tokens - self.available_token_capacity)
+            delay = 60.0 * max(
+                request_deficit / self.max_requests_per_minute,
+                token_deficit / self.max_tokens_per_minute,
+            )
+            await asyncio.sleep(delay)
+
+
+_RATE_LIMITER = RateLimiter(
+    OPENAI_MAX_REQUESTS_PER_MINUTE, OPENAI_MAX_TOKENS_PER_MINUTE
+)
+
+# Shared background event loop and client (see module docstring)
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+_CLIENT: Optional[AsyncOpenAI] = None
+_CONNECTION_SLOTS: Optional[asyncio.Semaphore] = None
+
+_RESPONSE_CACHE = ResponseCache(CACHE_DIR / "responses.sqlite3")
+# Everything besides the source text that shapes a text conversion.  It is
+# part of the semantic cache file name, so editing a prompt or changing the
+# model starts a fresh semantic cache instead of reusing stale conversions.
+_TEXT_CONVERSION_KEY = hashlib.sha256(
+    json.dumps(
+        [
+            SYSTEM_PROMPT,
+            CONTINUATION_PROMPT,
+            CONTINUATION_BATCH_PROMPT,
+            BATCH_PROMPT,
+            REFERENCE_PROMPT,
+            OPENAI_MODEL,
+            OPENAI_TEMPERATURE,
+        ],
+        ensure_ascii=False,
+    ).encode("utf-8")
+).hexdigest()[:16]
+_SEMANTIC_CACHE = SemanticCache(
+    CACHE_DIR / f"semantic-{OPENAI_EMBEDDING_MODEL}-{_TEXT_CONVERSION_KEY}.jsonl"
+)
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop, starting it on first use."""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(
+                target=_LOOP.run_forever, name="doc2md-openai", daemon=True
+            ).start()
+    return _LOOP
+
+
+def _get_client() -> AsyncOpenAI:
+    """Return the shared client; only called from the background loop."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=_MAX_CONNECTIONS,
+                    max_keepalive_connections=_MAX_KEEPALIVE_CONNECTIONS,
+                )
+            ),
+        )
+    return _CLIENT
+
+
+def _get_connection_slots() -> asyncio.Semaphore:
+    """
+    Return the process-wide request cap matching the client's connection
+    pool; only called from the background loop.  Per-call semaphores bound
+    one file, this one bounds all files together, so requests queue here
+    instead of timing out waiting for a pooled connection.
+    """
+    global _CONNECTION_SLOTS
+    if _CONNECTION_SLOTS is None:
+        _CONNECTION_SLOTS = asyncio.Semaphore(_MAX_CONNECTIONS)
+    return _CONNECTION_SLOTS
+
+
+@dataclass
+class _RequestContext:
+    """State shared by every request of one ``process_with_ai`` call."""
+
+    client: AsyncOpenAI
+    semaphore: asyncio.Semaphore
+    connections: asyncio.Semaphore
+    use_cache: bool
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+
+    def record_usage(self, usage) -> None:
+        """Accumulate prompt / prompt-cache token counts of one response."""
+        self.prompt_tokens += usage.prompt_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        if details is not None and details.cached_tokens:
+            self.cached_tokens += details.cached_tokens
+
+
+def _estimate_tokens(messages: list) -> int:
+    """Estimate the rate-limit token cost of a chat request (~4 chars/token)."""
+    prompt_chars = 0
+    image_tokens = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            prompt_chars += len(content)
+            continue
+        for part in content:
+            if part["type"] == "text":
+                prompt_chars += len(part["text"])
+            else:
+                image_tokens += _IMAGE_TOKEN_ESTIMATE
+    return prompt_chars // 4 + image_tokens + OPENAI_MAX_TOKENS
+
+
+_CONTAINS_CHINESE = re.compile(r"[\u4e00-\u9fff]").search
+_CJK_CHAR_RE = re.compile(r"[\u3000-\u9fff\uff00-\uffef]")
+
+_CHUNK_END_RE = re.compile(r"<<<CHUNK_\d+_END>>>")
+
+# A whole output line that must be dropped: image placeholders (including
+# the empty "![]()" / "![]"), and "I'm sorry" / "I apologize" refusals.
+_JUNK_LINE = (
+    r"[^\S\n]*"
+    r"(?:!\[.*\]\(.*\)|!\[\]|(?i:i'm sorry|i apologize).*)"
+    r"[^\S\n]*"
+)
+_JUNK_LINE_RE = re.compile(_JUNK_LINE)
+_CLEAN_RE = re.compile(rf"^{_JUNK_LINE}$\n?", re.MULTILINE)
 
 
 def _strip_markdown_fences(text: str) -> str:
@@ -64,48 +305,179 @@ def _strip_markdown_fences(text: str) -> str:
     return text
 
 
+def _keep_line(line: str) -> bool:
+    """Return False for output lines that are unwanted artifacts."""
+    return _JUNK_LINE_RE.fullmatch(line) is None
+
+
 def _clean_output(text: str) -> str:
-    """Post-process AI output to remove unwanted artifacts."""
-    lines = text.split("\n")
-    cleaned = []
-    for line in lines:
-        stripped = line.strip()
-        # Remove image placeholders
-        if re.match(r"^!\[.*\]\(.*\)$", stripped):
+    """
+    Post-process AI output to remove unwanted artifacts
+    in one regex pass.  Drops the same lines as :func:`_keep_line`; a
+    dropped last line may leave a trailing newline behind.
+    """
+    return _CLEAN_RE.sub("", text)
+
+
+async def _read_stream(
+    stream, clean_lines: bool, ctx: _RequestContext
+) -> str:
+    """
+    Collect a streamed completion.  With *clean_lines*, each line is run
+    through :func:`_keep_line` as soon as its newline arrives, matching
+    :func:`_clean_output` on the full text (up to a trailing newline).
+    The final usage event is recorded on *ctx*.
+    """
+    out = io.StringIO()
+    pending = ""  # current, not yet terminated line
+    async for event in stream:
+        if event.usage is not None:
+            ctx.record_usage(event.usage)
+        if not event.choices:
+            continue
+        delta = event.choices[0].delta.content
+        if not delta:
             continue
-        # Remove "I'm sorry" / refusal lines
-        if stripped.lower().startswith("i'm sorry") or stripped.lower().startswith("i apologize"):
+        if not clean_lines:
+            out.write(delta)
             continue
-        # Remove empty image references
-        if stripped in ("![]()", "![]"):
+
+        pending += delta
+        if "\n" not in delta:
             continue
-        cleaned.append(line)
-    return "\n".join(cleaned)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if _keep_line(line):
+                out.write(line)
+                out.write("\n")
+
+    if pending and (not clean_lines or _keep_line(pending)):
+        out.write(pending)
+    return out.getvalue()
+
+
+async def _call_openai(
+    ctx: _RequestContext, messages: list, clean_lines: bool = True
+) -> str:
+    """
+    Make a single streamed OpenAI API call and return the text response,
+    filtered line by line unless *clean_lines* is False.
+
+    The call waits for rate-limit capacity before dispatching and, if the
+    API still answers 429, retries with exponential backoff and jitter.
+    """
+    token_estimate = _estimate_tokens(messages)
+    attempt = 0
+    while True:
+        try:
+            async with ctx.semaphore, ctx.connections:
+                # Reserve capacity only once a slot is free, right before the
+                # send, so the bucket tracks actual dispatch
+                await _RATE_LIMITER.acquire(token_estimate)
+                stream = await ctx.client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=messages,
+                    max_tokens=OPENAI_MAX_TOKENS,
+                    temperature=OPENAI_TEMPERATURE,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                return await _read_stream(stream, clean_lines, ctx)
+        except RateLimitError as exc:
+            if attempt == _MAX_ATTEMPTS - 1:
+                raise RuntimeError(f"OpenAI API call failed: {exc}") from exc
+            await asyncio.sleep(2 ** attempt + random.random())
+            attempt += 1
+        except Exception as exc:
+            raise RuntimeError(f"OpenAI API call failed: {exc}") from exc
 
 
-def _call_openai(client: OpenAI, messages: list) -> str:
-    """Make a single OpenAI API call and return the text response."""
+def _response_cache_key(messages: list, clean_lines: bool) -> str:
+    """Exact-cache key of a request (system prompt + everything else)."""
+    # Everything after the system message that shapes the response; the
+    # serialized payload is only a temporary here and is dropped on return
+    user_prompt = json.dumps(
+        {
+            "model": OPENAI_MODEL,
+            "temperature": OPENAI_TEMPERATURE,
+            "clean_lines": clean_lines,
+            "messages": messages[1:],
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return request_key(messages[0]["content"], user_prompt)
+
+
+async def _cached_call(
+    ctx: _RequestContext, messages: list, clean_lines: bool = True
+) -> str:
+    """:func:`_call_openai` with the exact-match response cache in front of it."""
+    if not ctx.use_cache:
+        return await _call_openai(ctx, messages, clean_lines)
+
+    # Serializing and hashing an image payload is CPU work: keep it off the loop
+    key = await asyncio.get_running_loop().run_in_executor(
+        None, _response_cache_key, messages, clean_lines
+    )
+    return await _RESPONSE_CACHE.get_or_generate(
+        key, lambda: _call_openai(ctx, messages, clean_lines)
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Return the tiktoken encoding of ``OPENAI_MODEL``, or None if unavailable."""
+    if tiktoken is None:
+        return None
     try:
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=messages,
-            max_tokens=OPENAI_MAX_TOKENS,
-            temperature=OPENAI_TEMPERATURE,
-        )
-    except Exception as exc:
-        raise RuntimeError(f"OpenAI API call failed: {exc}") from exc
-    return response.choices[0].message.content or ""
+        return tiktoken.encoding_for_model(OPENAI_MODEL)
+    except Exception:
+        # Unknown model or BPE file not downloadable (offline)
+        return None
+
+
+def _count_tokens(text: str) -> int:
+    """
+    Count the tokens of *text* for ``OPENAI_MODEL``.  Without tiktoken,
+    estimate one token per CJK character and per four other characters.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK_CHAR_RE.findall(text))
+    return cjk + (len(text) - cjk) // 4
+
+
+def _element_tokens(elem: Dict) -> int:
+    """Token count of a text element, cached on the element as ``tokens``."""
+    tokens = elem.get("tokens")
+    if tokens is None:
+        tokens = elem["tokens"] = _count_tokens(elem["content"])
+    return tokens
+
+
+@lru_cache(maxsize=1)
+def _max_request_tokens() -> int:
+    """Content budget of one text request, capped by the context window."""
+    context_budget = (
+        _CONTEXT_WINDOW_TOKENS
+        - OPENAI_MAX_TOKENS
+        - _count_tokens(SYSTEM_PROMPT)
+        - _count_tokens(CONTINUATION_BATCH_PROMPT + BATCH_PROMPT)
+    )
+    return min(_MAX_REQUEST_TOKENS, context_budget)
 
 
 def _split_text_chunks(text_elements: List[Dict]) -> List[List[Dict]]:
-    """Split text elements into manageable chunks."""
+    """Split text elements into chunks of at most ``_MAX_TEXT_TOKENS_PER_CHUNK``."""
     chunks: List[List[Dict]] = []
     current_chunk: List[Dict] = []
     current_len = 0
 
     for elem in text_elements:
-        elem_len = len(elem["content"])
-        if current_chunk and current_len + elem_len > _MAX_TEXT_CHARS_PER_CHUNK:
+        elem_len = _element_tokens(elem)
+        if current_chunk and current_len + elem_len > _MAX_TEXT_TOKENS_PER_CHUNK:
             chunks.append(current_chunk)
             current_chunk = []
             current_len = 0
@@ -117,66 +489,336 @@ def _split_text_chunks(text_elements: List[Dict]) -> List[List[Dict]]:
     return chunks
 
 
-def _process_text_chunks(
-    client: OpenAI,
-    text_elements: List[Dict],
+def _batch_chunks(
+    chunks: List[List[Dict]], max_request_tokens: Optional[int] = None
+) -> List[List[List[Dict]]]:
+    """
+    Group consecutive chunks into batches whose combined content stays
+    within *max_request_tokens* (default: :func:`_max_request_tokens`),
+    so several chunks share one request.
+    """
+    if max_request_tokens is None:
+        max_request_tokens = _max_request_tokens()
+    batches: List[List[List[Dict]]] = []
+    current_batch: List[List[Dict]] = []
+    current_len = 0
+
+    for chunk in chunks:
+        chunk_len = sum(_element_tokens(elem) for elem in chunk)
+        if current_batch and current_len + chunk_len > max_request_tokens:
+            batches.append(current_batch)
+            current_batch = []
+            current_len = 0
+        current_batch.append(chunk)
+        current_len += chunk_len
+
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def _text_messages(file_name: str, content_parts: List[Dict]) -> List[Dict]:
+    """
+    Chat messages of one text request.  The system message is SYSTEM_PROMPT
+    verbatim, shared by every request of every file, and the file name
+    follows in its own user message, so the static prefix comes first.
+    """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": render_file_name_prompt(file_name)},
+        {"role": "user", "content": content_parts},
+    ]
+
+
+def _text_intro(is_first: bool, batched: bool = False) -> Dict[str, str]:
+    """
+    Leading user-content part for the first / a following text request;
+    *batched* selects the wording for a request holding several chunks.
+    """
+    if is_first:
+        text = (
+            "Please convert the following document content into "
+            "a structured GitBook Markdown page according to your instructions.\n\n"
+            "IMPORTANT: Convert ALL content below. Do NOT skip or summarize any section."
+        )
+    else:
+        continuation = CONTINUATION_BATCH_PROMPT if batched else CONTINUATION_PROMPT
+        text = (
+            f"{continuation}\n"
+            "This is the NEXT part of the same document. "
+            "Convert EVERY section, paragraph, and detail below."
+        )
+    return {"type": "text", "text": text}
+
+
+async def _process_text_chunk(
+    ctx: _RequestContext,
+    chunk: List[Dict],
+    idx: int,
     file_name: str,
+    reference: Optional[str] = None,
+) -> str:
+    """
+    Convert a single text chunk and return its markdown part.
+    *reference* is an earlier conversion of a similar chunk, sent along
+    as guidance (semantic cache).
+    """
+    is_first = idx == 0
+
+    content_parts = [_text_intro(is_first)]
+    if reference is not None:
+        content_parts.append({"type": "text", "text": REFERENCE_PROMPT + reference})
+    for elem in chunk:
+        content_parts.append({"type": "text", "text": elem["content"]})
+
+    messages = _text_messages(file_name, content_parts)
+
+    raw = await _cached_call(ctx, messages)
+    return _strip_markdown_fences(raw)
+
+
+def _split_batch_output(raw: str, first_idx: int, count: int) -> Optional[List[str]]:
+    """
+    Split a multi-chunk response on its end markers.
+    Returns None if any chunk's markers are missing or if the response has
+    text outside the markers, so nothing the model wrote is dropped.
+    """
+    pieces = _CHUNK_END_RE.split(_strip_markdown_fences(raw))
+    if len(pieces) != count + 1 or pieces[-1].strip():
+        return None
+
+    parts: List[str] = []
+    for idx, piece in enumerate(pieces[:-1], start=first_idx):
+        start_marker = f"<<<CHUNK_{idx}_START>>>"
+        before, found, body = piece.partition(start_marker)
+        if not found or before.strip():
+            return None
+        parts.append(_strip_markdown_fences(body))
+    return parts
+
+
+async def _process_text_batch(
+    ctx: _RequestContext,
+    batch: List[List[Dict]],
+    first_idx: int,
+    file_name: str,
+    reference: Optional[str] = None,
 ) -> List[str]:
-    """Process all text elements in chunks, return list of markdown parts."""
-    chunks = _split_text_chunks(text_elements)
-    results: List[str] = []
-
-    for idx, chunk in enumerate(chunks):
-        is_first = idx == 0
-
-        content_parts = []
-        if is_first:
-            content_parts.append({
-                "type": "text",
-                "text": (
-                    f"File Name: {file_name}\n\n"
-                    "Please convert the following document content into "
-                    "a structured GitBook Markdown page according to your instructions.\n\n"
-                    "IMPORTANT: Convert ALL content below. Do NOT skip or summarize any section."
-                ),
-            })
-        else:
-            content_parts.append({
-                "type": "text",
-                "text": (
-                    f"File Name: {file_name}\n\n"
-                    "This is the NEXT part of the same document. "
-                    "Convert EVERY section, paragraph, and detail below."
-                ),
-            })
+    """
+    Convert several consecutive chunks in one request and return one
+    markdown part per chunk.  Falls back to one request per chunk when
+    the response cannot be split back into chunks.
+
+    *reference* (see :func:`_process_text_chunk`) is only used for
+    single-chunk batches.
+    """
+    if len(batch) == 1:
+        return [await _process_text_chunk(
+            ctx, batch[0], first_idx, file_name, reference
+        )]
 
+    is_first = first_idx == 0
+    content_parts = [
+        _text_intro(is_first, batched=True),
+        {"type": "text", "text": BATCH_PROMPT},
+    ]
+    for idx, chunk in enumerate(batch, start=first_idx):
+        content_parts.append({"type": "text", "text": f"<<<CHUNK_{idx}_START>>>"})
         for elem in chunk:
             content_parts.append({"type": "text", "text": elem["content"]})
+        content_parts.append({"type": "text", "text": f"<<<CHUNK_{idx}_END>>>"})
+
+    messages = _text_messages(file_name, content_parts)
+
+    raw = await _cached_call(ctx, messages)
+    parts = _split_batch_output(raw, first_idx, len(batch))
+    if parts is not None:
+        return parts
+
+    return list(await asyncio.gather(*(
+        _process_text_chunk(ctx, chunk, idx, file_name)
+        for idx, chunk in enumerate(batch, start=first_idx)
+    )))
+
+
+def _chunk_text(chunk: List[Dict]) -> str:
+    """Source text of a chunk, as embedded and hashed for the semantic cache."""
+    return "\n\n".join(elem["content"] for elem in chunk)
 
-        system = SYSTEM_PROMPT if is_first else _CONTINUATION_PROMPT
-        messages = [
-            {"role": "system", "content": system},
-            {"role": "user", "content": content_parts},
-        ]
 
-        raw = _call_openai(client, messages)
-        part = _strip_markdown_fences(raw)
-        part = _clean_output(part)
-        results.append(part)
+def _source_hash(text: str) -> str:
+    """Hex sha256 of a chunk's source text (exact-match key)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-    return results
 
+async def _embed_chunks(
+    ctx: _RequestContext, texts: List[str]
+) -> Optional[List[List[float]]]:
+    """
+    Embed the source texts of several chunks in one request.
+    Returns None on failure — the semantic cache is best-effort.
+    """
+    try:
+        async with ctx.semaphore, ctx.connections:
+            response = await ctx.client.embeddings.create(
+                model=OPENAI_EMBEDDING_MODEL, input=texts
+            )
+    except Exception:
+        return None
+    return [item.embedding for item in response.data]
 
-def _process_image(client: OpenAI, image_elem: Dict, position_hint: str) -> str:
+
+def _passthrough_text(chunk: List[Dict], idx: int) -> Optional[str]:
+    """
+    Return the Markdown for a chunk that needs no AI call, else None:
+    whitespace-only chunks become "", and a later chunk consisting only of
+    Markdown tables (from ``_table_to_markdown``) with nothing to
+    translate is used verbatim.  The first chunk always goes to the
+    model, since it must produce the Document Header.
+    """
+    content = "\n\n".join(elem["content"] for elem in chunk)
+    if not content.strip():
+        return ""
+    if idx == 0 or _CONTAINS_CHINESE(content):
+        return None
+    if all(line.startswith("|") for line in content.split("\n") if line.strip()):
+        return content
+    return None
+
+
+def _semantic_scope(idx: int, file_name: str) -> str:
+    """
+    Semantic-cache scope of a chunk.  A first chunk carries the file's
+    Document Header, so it may only match first chunks of the same file.
+    """
+    return f"first:{file_name}" if idx == 0 else "body"
+
+
+async def _plan_text(
+    ctx: _RequestContext,
+    text_chunks: List[List[Dict]],
+    file_name: str,
+    use_semantic_cache: bool,
+    log: Callable[[str], None],
+) -> Tuple[
+    List[Optional[str]],
+    List[Tuple[int, Awaitable[List[str]]]],
+    Dict[int, Tuple[List[float], str]],
+]:
+    """
+    Resolve what can be resolved without a chat request and plan the rest.
+
+    Empty and plain-table chunks are passed through without a request.
+    With *use_semantic_cache*, a chunk whose source text exactly matches
+    a cached one reuses that conversion without a request; the others
+    are matched by embedding, and similar ones are sent individually
+    with the cached conversion as reference.  Similar text may differ in
+    a date or a figure, so it is never reused verbatim.
+    The remaining chunks are packed into batched requests.
+
+    Returns the per-chunk results so far (``None`` where a request is
+    still needed), the planned ``(first chunk index, request)`` jobs, and
+    the ``(embedding, source hash)`` to store each completed conversion
+    under.
+    """
+    total = len(text_chunks)
+    results: List[Optional[str]] = [
+        _passthrough_text(chunk, idx) for idx, chunk in enumerate(text_chunks)
+    ]
+    references: Dict[int, str] = {}
+
+    cache_keys: Dict[int, Tuple[List[float], str]] = {}
+    pending = [idx for idx in range(total) if results[idx] is None]
+    if use_semantic_cache and pending:
+        loop = asyncio.get_running_loop()
+        sources = {idx: _chunk_text(text_chunks[idx]) for idx in pending}
+        hashes = {idx: _source_hash(text) for idx, text in sources.items()}
+
+        # Cache reads (and the first load of the file) stay off the shared loop
+        exact = await loop.run_in_executor(
+            None,
+            lambda: {
+                idx: _SEMANTIC_CACHE.get(_semantic_scope(idx, file_name), hashes[idx])
+                for idx in pending
+            },
+        )
+        reused = 0
+        for idx, markdown in exact.items():
+            if markdown is not None:
+                results[idx] = markdown
+                reused += 1
+
+        pending = [idx for idx in pending if results[idx] is None]
+        vectors = None
+        if pending:
+            vectors = await _embed_chunks(ctx, [sources[idx] for idx in pending])
+        if vectors is not None:
+            cache_keys = {
+                idx: (vector, hashes[idx]) for idx, vector in zip(pending, vectors)
+            }
+            # The cosine scans are CPU-bound: keep them off the shared loop
+            matches = await loop.run_in_executor(
+                None,
+                lambda: {
+                    idx: _SEMANTIC_CACHE.lookup(vector, _semantic_scope(idx, file_name))
+                    for idx, (vector, _) in cache_keys.items()
+                },
+            )
+            for idx, match in matches.items():
+                if match is not None and match[0] >= SEMANTIC_HINT_THRESHOLD:
+                    references[idx] = match[1]
+
+        if reused or references:
+            log(
+                f"     ├─ Semantic cache: {reused} chunk(s) reused, "
+                f"{len(references)} guided"
+            )
+
+    # (first chunk index, request) — each request yields consecutive parts
+    jobs: List[Tuple[int, Awaitable[List[str]]]] = []
+    idx = 0
+    while idx < total:
+        if results[idx] is not None:
+            idx += 1
+        elif idx in references:
+            jobs.append((idx, _process_text_batch(
+                ctx, [text_chunks[idx]], idx, file_name, reference=references[idx]
+            )))
+            idx += 1
+        else:
+            end = idx
+            while end < total and results[end] is None and end not in references:
+                end += 1
+            for batch in _batch_chunks(text_chunks[idx:end]):
+                jobs.append((idx, _process_text_batch(ctx, batch, idx, file_name)))
+                idx += len(batch)
+
+    return results, jobs, cache_keys
+
+
+@lru_cache(maxsize=None)
+def _data_url_prefix(mime: str) -> str:
+    """``data:`` URL prefix for a MIME type (Base64 output is pure ASCII)."""
+    return f"data:{mime};base64,"
+
+
+async def _process_image(
+    ctx: _RequestContext,
+    image_elem: Dict,
+    position_hint: str,
+) -> str:
     """
     Process a single image and return its text description.
     Returns empty string if the image is a UI screenshot or processing fails.
     """
+    # Encode on demand; only the finished data URL lives in the payload
     mime = image_elem.get("mime", "image/png")
-    data_url = f"data:{mime};base64,{image_elem['content']}"
+    b64 = base64.b64encode(image_elem["part"].blob).decode("ascii")
+    data_url = _data_url_prefix(mime) + b64
+    del b64
 
     messages = [
-        {"role": "system", "content": _IMAGE_PROMPT},
+        {"role": "system", "content": IMAGE_PROMPT},
         {
             "role": "user",
             "content": [
@@ -193,7 +835,8 @@ def _process_image(client: OpenAI, image_elem: Dict, position_hint: str) -> str:
     ]
 
     try:
-        raw = _call_openai(client, messages)
+        # Unfiltered: a refusal on the first line discards the whole reply
+        raw = await _cached_call(ctx, messages, clean_lines=False)
         raw = raw.strip()
 
         # If AI flagged as UI screenshot, skip
@@ -204,15 +847,131 @@ def _process_image(client: OpenAI, image_elem: Dict, position_hint: str) -> str:
         if raw.lower().startswith("i'm sorry") or raw.lower().startswith("i apologize"):
             return ""
 
-        return _clean_output(raw)
+        return _clean_output(raw).rstrip()
 
     except Exception:
         # Image processing failure should not break the pipeline
         return ""
 
 
+def _separate_elements(
+    elements: Iterable[Dict[str, str]],
+) -> Tuple[List[Dict[str, str]], List[Tuple[int, Dict, str]]]:
+    """
+    Split the (possibly streamed) elements into text elements and
+    ``(index_in_original, element, position_hint)`` image entries in one
+    pass.  The hint is only sliced for images, so text-only documents pay
+    nothing for it.
+    """
+    text_elements = []
+    image_elements = []
+
+    last_text = None
+    for i, elem in enumerate(elements):
+        if elem["type"] == "text":
+            text_elements.append(elem)
+            last_text = elem
+        elif elem["type"] == "image":
+            # Use first 80 chars of the preceding text as position hint
+            hint = last_text["content"][:80] if last_text else ""
+            image_elements.append((i, elem, hint))
+
+    return text_elements, image_elements
+
+
+async def _tagged(
+    tag: Tuple[str, int], request: Awaitable[Any]
+) -> Tuple[Tuple[str, int], Any]:
+    """Await *request* and return its result together with *tag*."""
+    return tag, await request
+
+
+async def _process_with_ai_async(
+    text_chunks: List[List[Dict]],
+    image_elements: List[Tuple[int, Dict, str]],
+    file_name: str,
+    num_concurrent: int,
+    use_cache: bool,
+    use_semantic_cache: bool,
+    log: Callable[[str], None],
+) -> str:
+    """Async body of :func:`process_with_ai`."""
+    # ── Step 2: Dispatch all text chunks and images at once ─
+    ctx = _RequestContext(
+        client=_get_client(),
+        semaphore=asyncio.Semaphore(num_concurrent),
+        connections=_get_connection_slots(),
+        use_cache=use_cache,
+    )
+    # Images do not depend on the text plan, so they start right away
+    tasks = [
+        asyncio.create_task(_tagged(("image", j), _process_image(ctx, img_elem, hint)))
+        for j, (_, img_elem, hint) in enumerate(image_elements)
+    ]
+    try:
+        text_results, jobs, cache_keys = await _plan_text(
+            ctx, text_chunks, file_name, use_semantic_cache, log
+        )
+        tasks += [
+            asyncio.create_task(_tagged(("text", first_idx), request))
+            for first_idx, request in jobs
+        ]
+
+        # Place each response by its original index as soon as it arrives
+        descriptions = [""] * len(image_elements)
+        for done, next_done in enumerate(asyncio.as_completed(tasks), start=1):
+            (kind, index), output = await next_done
+            if kind == "image":
+                descriptions[index] = output
+                label = f"image {index + 1}"
+            else:
+                for idx, part in enumerate(output, start=index):
+                    text_results[idx] = part
+                    if idx in cache_keys and part:
+                        vector, source_hash = cache_keys[idx]
+                        _SEMANTIC_CACHE.add(
+                            vector, _semantic_scope(idx, file_name), part, source_hash
+                        )
+                label = (
+                    f"chunk {index + 1}" if len(output) == 1
+                    else f"chunks {index + 1}-{index + len(output)}"
+                )
+            log(f"     │  [{done}/{len(tasks)}] {label} done")
+    finally:
+        # A failed text request aborts the file; stop what is still in flight
+        # and retrieve every outcome so no task exception goes unobserved
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    image_descriptions = [desc for desc in descriptions if desc]
+
+    if ctx.prompt_tokens:
+        hit_rate = 100 * ctx.cached_tokens / ctx.prompt_tokens
+        log(
+            f"     ├─ Prompt cache: {ctx.cached_tokens}/{ctx.prompt_tokens} "
+            f"input tokens cached ({hit_rate:.0f}%)"
+        )
+
+    # ── Step 3: Merge text results ──────────────────────────
+    # Text chunks are the primary content; image descriptions
+    # are appended as a supplementary section (if any)
+    merged = "\n\n".join(part for part in text_results if part)
+
+    if image_descriptions:
+        merged += "\n\n---\n\n## Technical Diagram Descriptions\n\n"
+        for i, desc in enumerate(image_descriptions, 1):
+            merged += f"### Diagram {i}\n\n{desc}\n\n"
+
+    return merged
+
+
 def process_with_ai(
-    elements: List[Dict[str, str]], file_name: str
+    elements: Iterable[Dict[str, str]],
+    file_name: str,
+    num_concurrent: int = _NUM_CONCURRENT,
+    use_cache: bool = CACHE_ENABLED,
+    use_semantic_cache: bool = SEMANTIC_CACHE_ENABLED,
+    log: Callable[[str], None] = print,
 ) -> str:
     """
     Send the parsed document elements to OpenAI GPT-4o and return
@@ -222,12 +981,27 @@ def process_with_ai(
     - Text content is never lost due to image processing failures.
     - Images are individually described and inserted at their original positions.
 
+    All requests are issued concurrently; results are still assembled
+    in document order.  Safe to call from several threads at once.
+
     Parameters
     ----------
-    elements : list[dict]
-        Ordered list produced by ``docx_parser.parse_docx``.
+    elements : iterable of dict
+        Ordered elements from ``docx_parser.parse_docx`` or
+        ``docx_parser.parse_docx_iter``; an iterator is consumed once.
     file_name : str
         Original file name (used in the metadata header).
+    num_concurrent : int
+        Maximum number of OpenAI requests in flight at once.
+    use_cache : bool
+        Serve repeated requests from the on-disk response cache.  When
+        False, the semantic cache is bypassed as well, so every chunk is
+        converted afresh.
+    use_semantic_cache : bool
+        Reuse conversions of identical text chunks; pass those of similar
+        chunks as reference.
+    log : callable
+        Receives progress lines (defaults to ``print``).
 
     Returns
     -------
@@ -240,46 +1014,31 @@ def process_with_ai(
             "Please add it to your .env file."
         )
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
     # ── Step 1: Separate text and image elements ────────────
-    text_elements = []
-    image_elements = []  # (index_in_original, element, position_hint)
+    # Runs in the caller's thread, so streamed parsing and token counting
+    # never block the shared event loop.
+    text_elements, image_elements = _separate_elements(elements)
+    log(f"     ├─ Text blocks : {len(text_elements)}")
+    log(f"     ├─ Images      : {len(image_elements)}")
 
-    last_text_hint = ""
-    for i, elem in enumerate(elements):
-        if elem["type"] == "text":
-            text_elements.append(elem)
-            # Use first 80 chars as position hint for next image
-            last_text_hint = elem["content"][:80]
-        elif elem["type"] == "image":
-            image_elements.append((i, elem, last_text_hint))
-
-    # ── Step 2: Process all text ────────────────────────────
     text_chunks = _split_text_chunks(text_elements)
-    total_chunks = len(text_chunks)
-    if total_chunks > 1:
-        print(f"     ├─ Text split into {total_chunks} chunks")
-
-    text_results = _process_text_chunks(client, text_elements, file_name)
-
-    # ── Step 3: Process images individually ─────────────────
-    image_descriptions: List[str] = []
+    if len(text_chunks) > 1:
+        log(f"     ├─ Text split into {len(text_chunks)} chunks")
     if image_elements:
-        print(f"     ├─ Processing {len(image_elements)} images individually ...")
-        for idx, (orig_idx, img_elem, hint) in enumerate(image_elements):
-            desc = _process_image(client, img_elem, hint)
-            if desc:
-                image_descriptions.append(desc)
-
-    # ── Step 4: Merge text results ──────────────────────────
-    # Text chunks are the primary content; image descriptions
-    # are appended as a supplementary section (if any)
-    merged = "\n\n".join(text_results)
+        log(f"     ├─ Processing {len(image_elements)} images individually ...")
 
-    if image_descriptions:
-        merged += "\n\n---\n\n## Technical Diagram Descriptions\n\n"
-        for i, desc in enumerate(image_descriptions, 1):
-            merged += f"### Diagram {i}\n\n{desc}\n\n"
-
-    return merged
+    future = asyncio.run_coroutine_threadsafe(
+        _process_with_ai_async(
+            text_chunks,
+            image_elements,
+            file_name,
+            num_concurrent,
+            use_cache,
+            # An identical chunk would otherwise come back from the semantic
+            # cache verbatim, defeating a deliberate re-conversion
+            use_semantic_cache and use_cache,
+            log,
+        ),
+        _get_loop(),
+    )
+    return future.result()
@@ -0,0 +1,224 @@
+"""
+Cache Module
+────────────
+Local caches for OpenAI responses.
+
+``ResponseCache`` is the exact-match tier: a SQLite table of responses
+keyed by a hash of the system prompt and the rest of the request (see
+``request_key``).  ``ResponseCache.get_or_generate`` returns the stored
+response or calls the API and stores what it returns.
+
+``SemanticCache`` stores converted text chunks indexed by a hash and the
+embedding of their source text.  A chunk identical to one converted
+before — boilerplate, footers, repeated sections across documents — can
+reuse the earlier Markdown; a similar one can be guided by it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import operator
+import sqlite3
+import threading
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def _sha256(text: str) -> str:
+    """Hex sha256 of *text*."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _system_hash(system_prompt: str) -> str:
+    """:func:`_sha256` of a system prompt, memoized: only a few ever occur."""
+    return _sha256(system_prompt)
+
+
+def request_key(system_prompt: str, user_prompt: str) -> str:
+    """
+    Cache key of a request: hash of the system and user prompt hashes.
+    *user_prompt* must capture everything besides the system prompt that
+    determines the response (model, parameters, user messages).
+    """
+    # The user prompt is never memoized: it can hold multi-MB image data
+    return _sha256(_system_hash(system_prompt) + _sha256(user_prompt))
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    """Scale *vector* to unit length so a dot product is the cosine."""
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class ResponseCache:
+    """
+    Exact-match response store backed by a SQLite file.
+
+    The database is opened lazily on first use, so constructing the cache
+    touches no files.  SQLite serializes concurrent writers, which makes
+    the file safe to share between processes.  Within a process the one
+    connection is guarded by a lock, so the cache may be used from any
+    thread; :meth:`get_or_generate` runs its database calls in the event
+    loop's default executor.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the open connection; call with the lock held."""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the response stored under *key*, if any."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, response: str) -> None:
+        """Store *response* under *key*, replacing any earlier entry."""
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)",
+                (key, response),
+            )
+
+    async def get_or_generate(
+        self, key: str, call_fn: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        Return the response cached under *key* (see :func:`request_key`),
+        or await *call_fn* and cache its result.
+
+        Takes the key rather than the prompts, so a large request payload
+        need not stay referenced while the call is in flight.
+        """
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self.get, key)
+        if cached is not None:
+            return cached
+        response = await call_fn()
+        await loop.run_in_executor(None, self.put, key, response)
+        return response
+
+
+class SemanticCache:
+    """
+    Embedding → Markdown store persisted as JSON lines.
+
+    Every entry carries a *scope*; lookups only consider entries of the
+    same scope.  :meth:`get` finds an entry by the exact hash of its
+    source text; :meth:`lookup` finds the nearest by embedding.  Lookup
+    is a brute-force cosine scan over compact float32 vectors, which is
+    ample for the few thousand chunks a local cache accumulates.  It is
+    still CPU work, so callers on an event loop should run lookups in an
+    executor.
+
+    Thread-safe: loading and adding are serialized by a lock, and lookups
+    scan a snapshot of the entries.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries: Optional[Dict[str, List[Tuple[array, str]]]] = None
+        self._by_source: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[Tuple[array, str]]]:
+        """Return the entries grouped by scope; call with the lock held."""
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with self.path.open(encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue  # torn write from an interrupted run
+                        self._index(
+                            record["scope"],
+                            record["embedding"],
+                            record["markdown"],
+                            record.get("source"),
+                        )
+            except FileNotFoundError:
+                pass
+        return self._entries
+
+    def _index(
+        self,
+        scope: str,
+        vector: Sequence[float],
+        markdown: str,
+        source_hash: Optional[str],
+    ) -> None:
+        """Add one entry to the in-memory indexes; call with the lock held."""
+        self._entries.setdefault(scope, []).append((array("f", vector), markdown))
+        if source_hash is not None:
+            self._by_source[(scope, source_hash)] = markdown
+
+    def get(self, scope: str, source_hash: str) -> Optional[str]:
+        """Return the markdown stored for exactly this source text, if any."""
+        with self._lock:
+            self._load()
+            return self._by_source.get((scope, source_hash))
+
+    def lookup(
+        self, embedding: Sequence[float], scope: str
+    ) -> Optional[Tuple[float, str]]:
+        """Return ``(cosine_similarity, markdown)`` of the nearest entry, if any."""
+        query = _normalize(embedding)
+        with self._lock:
+            candidates = list(self._load().get(scope, ()))
+        best: Optional[Tuple[float, str]] = None
+        for vector, markdown in candidates:
+            similarity = sum(map(operator.mul, query, vector))
+            if best is None or similarity > best[0]:
+                best = (similarity, markdown)
+        return best
+
+    def add(
+        self,
+        embedding: Sequence[float],
+        scope: str,
+        markdown: str,
+        source_hash: str,
+    ) -> None:
+        """
+        Store *markdown* under *embedding* and the hash of its source text,
+        and append it to the cache file.
+        """
+        vector = _normalize(embedding)
+        record = {
+            "scope": scope,
+            "source": source_hash,
+            "embedding": vector,
+            "markdown": markdown,
+        }
+        with self._lock:
+            self._load()
+            self._index(scope, vector, markdown, source_hash)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
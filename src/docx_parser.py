@@ -5,31 +5,36 @@ Reads a .docx file and extracts text paragraphs, tables, and inline images
 in their original document order.  Each element is returned as a dictionary:
 
     {"type": "text",  "content": "paragraph text ..."}
-    {"type": "image", "content": "<base64 string>", "mime": "image/png"}
+    {"type": "image", "part": <docx ImagePart>, "mime": "image/png"}
     {"type": "text",  "content": "| col1 | col2 |\\n|---|---|\\n..."}  (table as Markdown)
+
+Images are returned as their package part rather than encoded data, so
+the Base64 payload is only built when a request is actually sent.
 """
 
 from __future__ import annotations
 
-import base64
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List
 
 from docx import Document
 from docx.oxml.ns import qn
 from docx.table import Table
+from docx.text.paragraph import Paragraph
+from lxml import etree
 
 
-# ── Helpers ──────────────────────────────────────────────────
+# ── Namespaced tag names (resolved once, used in hot loops) ──
+_W_P = qn("w:p")
+_W_TBL = qn("w:tbl")
+_W_R = qn("w:r")
+_W_T = qn("w:t")
+_A_BLIP = qn("a:blip")
+_R_EMBED = qn("r:embed")
 
-def _get_image_base64(image_part) -> Tuple[str, str]:
-    """Extract base64-encoded data and MIME type from an image part."""
-    blob: bytes = image_part.blob
-    content_type: str = image_part.content_type
-    b64_str = base64.b64encode(blob).decode("utf-8")
-    return b64_str, content_type
 
+# ── Helpers ──────────────────────────────────────────────────
 
 def _dedup_text(text: str) -> str:
     """
@@ -60,6 +65,9 @@ def _dedup_text(text: str) -> str:
 
         # Check for partial duplication patterns (sentence-level)
         # e.g. "Some long sentence here.Some long sentence here."
+        if length < 6:
+            cleaned.append(line)
+            continue
         deduped = _dedup_sentence(stripped)
         if deduped != stripped:
             cleaned.append(line.replace(stripped, deduped))
@@ -80,14 +88,26 @@ def _dedup_sentence(text: str) -> str:
 
     # Try to find a split point where first half == second half
     # Allow for minor length differences (±2 chars)
+    #
+    # A split at *half* matches when text[:half].rstrip() equals
+    # text[half:].rstrip().  With ``end`` = length of text.rstrip(), that
+    # is: the remainder text[half:end] is a prefix of text and only
+    # whitespace sits between that prefix and *half* — checked without
+    # building either half.
+    end = len(text.rstrip())
     for half in range(length // 2 + 2, max(2, length // 2 - 2), -1):
         if half >= length:
             continue
-        candidate = text[:half]
-        remainder = text[half:]
-        # Check if remainder starts with (or equals) the candidate
-        if remainder == candidate or remainder.rstrip() == candidate.rstrip():
-            return candidate
+        rem_len = max(0, end - half)
+        if rem_len > half:
+            continue
+        # Cheap first-character reject before the full comparison
+        if rem_len and text[half] != text[0]:
+            continue
+        if text[rem_len:half].strip():
+            continue
+        if text.startswith(text[half:end]):
+            return text[:half]
 
     return text
 
@@ -96,37 +116,65 @@ def _extract_paragraph_elements(paragraph, rels) -> List[Dict[str, str]]:
     """
     Walk through the XML of a single paragraph and yield text / image
     elements *in the order they appear*.
+
+    The paragraph is traversed once with ``lxml.etree.iterwalk``, which
+    reports only ``w:r`` / ``w:t`` / ``a:blip`` nodes.  Only runs that are
+    direct children of the paragraph count; a run containing an image
+    contributes its images, any other run the text of its ``w:t``
+    children.
     """
     elements: List[Dict[str, str]] = []
     text_buffer: List[str] = []
 
-    for child in paragraph._element:
-        if child.tag == qn("w:r"):
-            drawings = child.findall(f".//{qn('a:blip')}")
-            if drawings:
-                if text_buffer:
-                    joined = "".join(text_buffer).strip()
-                    if joined:
-                        elements.append({"type": "text", "content": _dedup_text(joined)})
-                    text_buffer.clear()
-
-                for blip in drawings:
-                    embed_id = blip.get(qn("r:embed"))
-                    if embed_id and embed_id in rels:
-                        rel = rels[embed_id]
-                        image_part = rel.target_part
-                        b64, mime = _get_image_base64(image_part)
-                        elements.append(
-                            {"type": "image", "content": b64, "mime": mime}
-                        )
-            else:
-                # Only use <w:t> children — avoid doubling with child.text
-                run_texts: List[str] = []
-                for t_elem in child.findall(qn("w:t")):
-                    if t_elem.text:
-                        run_texts.append(t_elem.text)
+    p_elem = paragraph._element
+    run = None  # top-level <w:r> currently being walked
+    run_texts: List[str] = []
+    run_blips: List = []
+
+    for event, node in etree.iterwalk(
+        p_elem, events=("start", "end"), tag=(_W_R, _W_T, _A_BLIP)
+    ):
+        tag = node.tag
+        if tag == _W_R:
+            if event == "start":
+                if run is None and node.getparent() is p_elem:
+                    run = node
+                    run_texts = []
+                    run_blips = []
+                continue
+            if node is not run:
+                continue
+            run = None
+
+            if not run_blips:
                 if run_texts:
                     text_buffer.append("".join(run_texts))
+                continue
+
+            if text_buffer:
+                joined = "".join(text_buffer).strip()
+                if joined:
+                    elements.append({"type": "text", "content": _dedup_text(joined)})
+                text_buffer.clear()
+
+            for blip in run_blips:
+                embed_id = blip.get(_R_EMBED)
+                if embed_id and embed_id in rels:
+                    rel = rels[embed_id]
+                    image_part = rel.target_part
+                    elements.append({
+                        "type": "image",
+                        "part": image_part,
+                        "mime": image_part.content_type,
+                    })
+
+        elif run is None or event == "end":
+            continue
+        elif tag == _A_BLIP:
+            run_blips.append(node)
+        # Only use the run's own <w:t> children — avoid doubling with run.text
+        elif node.getparent() is run and node.text:
+            run_texts.append(node.text)
 
     if text_buffer:
         joined = "".join(text_buffer).strip()
@@ -165,20 +213,68 @@ def _table_to_markdown(table: Table) -> str:
     return "\n".join(lines)
 
 
-def _iter_block_items(document):
+def _iter_block_items(document) -> Iterator[Paragraph | Table]:
+    """
+    Yield each paragraph and table in *document order*, wrapping the
+    body's XML children on demand.
+    """
+    part = document.part
+    for child in document.element.body:
+        if child.tag == _W_P:
+            yield Paragraph(child, part)
+        elif child.tag == _W_TBL:
+            yield Table(child, part)
+
+
+def _iter_elements(doc) -> Iterator[Dict[str, str]]:
     """
-    Yield each paragraph and table in *document order*.
+    Yield the document's elements in order, merging consecutive text
+    elements.  Fragments are collected and joined once per run of text.
     """
-    body = document.element.body
-    for child in body:
-        if child.tag == qn("w:p"):
-            yield ("paragraph", child)
-        elif child.tag == qn("w:tbl"):
-            yield ("table", child)
+    rels = doc.part.rels
+    current_text_parts: List[str] = []
+
+    for block in _iter_block_items(doc):
+        if isinstance(block, Paragraph):
+            block_elements = _extract_paragraph_elements(block, rels)
+        else:
+            md_table = _table_to_markdown(block)
+            if not md_table.strip():
+                continue
+            block_elements = [{"type": "text", "content": md_table}]
+
+        for elem in block_elements:
+            if elem["type"] == "text":
+                current_text_parts.append(elem["content"])
+                continue
+            if current_text_parts:
+                yield {"type": "text", "content": "\n\n".join(current_text_parts)}
+                current_text_parts = []
+            yield elem
+
+    if current_text_parts:
+        yield {"type": "text", "content": "\n\n".join(current_text_parts)}
 
 
 # ── Public API ───────────────────────────────────────────────
 
+def parse_docx_iter(file_path: str | Path) -> Iterator[Dict[str, str]]:
+    """
+    Like :func:`parse_docx`, but yield the content elements one at a time
+    instead of building the whole list.
+
+    The file is validated and opened immediately; elements are extracted
+    as the iterator is consumed.
+    """
+    file_path = Path(file_path)
+    if not file_path.exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+    if file_path.suffix.lower() != ".docx":
+        raise ValueError(f"Not a .docx file: {file_path}")
+
+    return _iter_elements(Document(str(file_path)))
+
+
 def parse_docx(file_path: str | Path) -> List[Dict[str, str]]:
     """
     Parse a .docx file and return an ordered list of content elements,
@@ -192,52 +288,7 @@ def parse_docx(file_path: str | Path) -> List[Dict[str, str]]:
     Returns
     -------
     list[dict]
-        Each dict has ``type`` ("text" | "image") and ``content``.
-        Image dicts additionally carry a ``mime`` key.
+        Text dicts have ``type`` "text" and ``content``; image dicts have
+        ``type`` "image", the image ``part`` and its ``mime`` type.
     """
-    file_path = Path(file_path)
-    if not file_path.exists():
-        raise FileNotFoundError(f"File not found: {file_path}")
-    if file_path.suffix.lower() != ".docx":
-        raise ValueError(f"Not a .docx file: {file_path}")
-
-    doc = Document(str(file_path))
-    rels = doc.part.rels
-
-    para_map = {}
-    for p in doc.paragraphs:
-        para_map[id(p._element)] = p
-
-    table_map = {}
-    for t in doc.tables:
-        table_map[id(t._element)] = t
-
-    all_elements: List[Dict[str, str]] = []
-
-    for block_type, block_xml in _iter_block_items(doc):
-        if block_type == "paragraph":
-            para_obj = para_map.get(id(block_xml))
-            if para_obj:
-                para_elements = _extract_paragraph_elements(para_obj, rels)
-                all_elements.extend(para_elements)
-
-        elif block_type == "table":
-            table_obj = table_map.get(id(block_xml))
-            if table_obj:
-                md_table = _table_to_markdown(table_obj)
-                if md_table.strip():
-                    all_elements.append({"type": "text", "content": md_table})
-
-    # Merge consecutive text elements for cleaner payloads
-    merged: List[Dict[str, str]] = []
-    for elem in all_elements:
-        if (
-            elem["type"] == "text"
-            and merged
-            and merged[-1]["type"] == "text"
-        ):
-            merged[-1]["content"] += "\n\n" + elem["content"]
-        else:
-            merged.append(elem)
-
-    return merged
+    return list(parse_docx_iter(file_path))
@@ -1,5 +1,17 @@
 """
 Prompt constants for OpenAI API calls.
+
+This module is the single home of every prompt the converter sends.
+
+SYSTEM_PROMPT is sent verbatim as the system message of every text
+request, for every file.  OpenAI caches prompts by exact prefix, so
+nothing per-file or per-request may be interpolated into it; the file
+name goes in its own user message (see ``render_file_name_prompt``).
+Any edit to SYSTEM_PROMPT invalidates the prompt cache.  Editing any
+prompt here (or the model / temperature) also starts fresh on-disk
+caches: the exact response cache keys on the full request, and the
+semantic cache file name carries a hash of the text prompts, model and
+temperature.  Change prompts deliberately.
 """
 
 SYSTEM_PROMPT: str = """Role: You are a Senior Technical Documentation Engineer. Your mission is to transform raw, multi-modal documents (docx, web scraps, dev notes) into professional, structured, and Markdown-formatted GitBook pages in English.
@@ -44,3 +56,60 @@ You will receive images interleaved with text.
 - Include ALL discussion records with their dates (e.g., "20241115", "20241112", "9/10 discussion", "7/29", "7/30").
 - Include meeting notes, Q&A, edge cases, proposals, decisions, and TODO items.
 - Include dependency info, release plans, tracking data, pricing, GTM plans, post-release processes."""
+
+# Prompt for processing images only
+IMAGE_PROMPT: str = """You are a Senior Technical Documentation Engineer.
+Analyze this image from a technical document:
+- If it is a technical diagram, architecture chart, flow chart, or data table:
+  Describe it in detail as structured English text (use bullet points or numbered lists).
+- If it is a UI screenshot or interface mockup:
+  Reply with exactly: SKIP_UI_IMAGE
+- Do NOT output any image references or placeholders.
+- Do NOT invent information not shown in the image."""
+
+# Leading user instructions for text chunks after the first
+CONTINUATION_PROMPT: str = """You are continuing the conversion of the same document.
+The previous chunk has already been converted. Now convert THIS chunk only.
+- Do NOT add a Document Header again.
+- Do NOT repeat content from previous chunks.
+- Continue with the next logical section headings.
+- Maintain the same Markdown style and formatting.
+- CRITICAL: Convert EVERY SINGLE paragraph, bullet point, table row, discussion note, date, Q&A, proposal, decision, and detail. This is NOT a summary task. Nothing can be omitted.
+- Translate all Chinese content into professional technical English.
+"""
+
+# Leading user instructions for a batch of text chunks after the first
+CONTINUATION_BATCH_PROMPT: str = """You are continuing the conversion of the same document.
+The previous chunks have already been converted. Now convert the chunks below only.
+- Do NOT add a Document Header to any chunk.
+- Do NOT repeat content from previous chunks.
+- Continue with the next logical section headings.
+- Maintain the same Markdown style and formatting.
+- CRITICAL: Convert EVERY SINGLE paragraph, bullet point, table row, discussion note, date, Q&A, proposal, decision, and detail. This is NOT a summary task. Nothing can be omitted.
+- Translate all Chinese content into professional technical English.
+"""
+
+# Leading user instructions when several chunks share one request
+BATCH_PROMPT: str = """Batch Format:
+The user content contains several consecutive chunks of the same document,
+each wrapped in <<<CHUNK_n_START>>> and <<<CHUNK_n_END>>> markers.
+- Convert each chunk separately and in order; together they continue one document.
+- Only chunk 0 (the start of the document) begins with the Document Header.
+  Never add a Document Header to any other chunk.
+- Wrap the Markdown for each chunk in the SAME markers, each on its own line:
+  <<<CHUNK_n_START>>>
+  ...converted Markdown for chunk n...
+  <<<CHUNK_n_END>>>
+- Output nothing outside the markers, not even the Document Header."""
+
+# Leading user instructions carrying a semantic-cache reference conversion
+REFERENCE_PROMPT: str = """Reference: a near-identical passage was converted earlier as shown below.
+Reuse its wording and structure wherever the source content is the same,
+and change only what actually differs. Still convert ALL of the content.
+
+"""
+
+
+def render_file_name_prompt(file_name: str) -> str:
+    """Return the user message that tells the model the source file name."""
+    return f"File Name: {file_name}"